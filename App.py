@@ -1,9 +1,5 @@
-from pandas.api.types import (
-    is_categorical_dtype,
-    is_datetime64_any_dtype,
-    is_numeric_dtype,
-    is_object_dtype,
-)
+import re
+
 import pandas as pd
 import numpy as np
 import streamlit as st
@@ -16,12 +12,97 @@ st.set_page_config(
 
 st.title('Análise do Banco de dados E-MEC - Terapia Ocupacional')
 
-def filter_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+# Numeric columns of the E-MEC report; the "Ano" columns have blanks, so they stay float
+COLUMN_DTYPES = {
+    'Código IES': 'int32',
+    'Código Curso': 'int32',
+    'Ano CC': 'float32',
+    'Ano CPC': 'float32',
+    'Ano ENADE': 'float32',
+    'Ano IDD': 'float32',
+    'Vagas Autorizadas': 'int32',
+    'Código Área Geral CINE': 'int32',
+    'Código Área Específica CINE': 'int32',
+    'Código Área Detalhada CINE': 'int32',
+}
+
+# Date layouts accepted by the filters, as (regex, strptime format)
+DATE_FORMATS = [
+    (re.compile(r'\d{2}/\d{2}/\d{4}'), '%d/%m/%Y'),
+    (re.compile(r'\d{4}-\d{2}-\d{2}'), '%Y-%m-%d'),
+]
+
+REGEX_METACHARACTERS = re.compile(r'[.^$*+?{}\[\]\\|()]')
+
+def column_cardinality(df: pd.DataFrame) -> dict:
+    """
+    Counts the unique values of every column
+
+    Args:
+        df (pd.DataFrame): Original dataframe
+
+    Returns:
+        dict: Number of unique values per column
+    """
+    return df.nunique().to_dict()
+
+def column_ranges(df: pd.DataFrame) -> dict:
+    """
+    Finds the minimum and maximum of every numeric column
+
+    Args:
+        df (pd.DataFrame): Original dataframe
+
+    Returns:
+        dict: (min, max) per numeric column
+    """
+    ranges = {}
+    for col in df.columns:
+        if df[col].dtype.kind in 'iuf':
+            values = df[col].to_numpy(dtype=float)
+            ranges[col] = (float(np.nanmin(values)), float(np.nanmax(values)))
+    return ranges
+
+@st.cache_data
+def convert_datetimes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts date columns into a standard format (datetime, no timezone)
+
+    Args:
+        df (pd.DataFrame): Original dataframe
+
+    Returns:
+        pd.DataFrame: Dataframe with date columns as datetime
+    """
+    df = df.copy()
+
+    for col in df.columns:
+        if df[col].dtype.kind == 'O':
+            # Only parse columns whose first values look like dates, with an explicit format
+            sample = df[col].dropna().head(20).astype(str)
+            for pattern, date_format in DATE_FORMATS:
+                if len(sample) and sample.str.fullmatch(pattern).all():
+                    try:
+                        df[col] = pd.to_datetime(df[col], format=date_format)
+                    except Exception:
+                        pass
+                    break
+
+        if df[col].dtype.kind == 'M':
+            df[col] = df[col].dt.tz_localize(None)
+
+    return df
+
+def filter_dataframe(
+    df: pd.DataFrame, cardinality: dict, ranges: dict
+) -> pd.DataFrame:
     """
     Adds a UI on top of a dataframe to let viewers filter columns
 
     Args:
         df (pd.DataFrame): Original dataframe
+        cardinality (dict): Number of unique values per column
+        ranges (dict): (min, max) per numeric column
 
     Returns:
         pd.DataFrame: Filtered dataframe
@@ -31,18 +112,10 @@ def filter_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     if not modify:
         return df
 
-    df = df.copy()
+    df = convert_datetimes(df)
 
-    # Try to convert datetimes into a standard format (datetime, no timezone)
-    for col in df.columns:
-        if is_object_dtype(df[col]):
-            try:
-                df[col] = pd.to_datetime(df[col])
-            except Exception:
-                pass
-
-        if is_datetime64_any_dtype(df[col]):
-            df[col] = df[col].dt.tz_localize(None)
+    # Predicates are combined into one mask and applied once at the end
+    mask = np.ones(len(df), dtype=bool)
 
     modification_container = st.container()
 
@@ -51,16 +124,20 @@ def filter_dataframe(df: pd.DataFrame) -> pd.DataFrame:
         for column in to_filter_columns:
             left, right = st.columns((1, 20))
             # Treat columns with < 10 unique values as categorical
-            if is_categorical_dtype(df[column]) or df[column].nunique() < 10:
+            is_categorical = isinstance(df[column].dtype, pd.CategoricalDtype)
+            if is_categorical or cardinality[column] < 10:
                 user_cat_input = right.multiselect(
                     f"Valores para {column}",
                     df[column].unique(),
                     default=list(df[column].unique()),
                 )
-                df = df[df[column].isin(user_cat_input)]
-            elif is_numeric_dtype(df[column]):
-                _min = float(df[column].min())
-                _max = float(df[column].max())
+                if is_categorical:
+                    codes = df[column].cat.categories.get_indexer(user_cat_input)
+                    mask &= df[column].cat.codes.isin(codes).to_numpy()
+                else:
+                    mask &= df[column].isin(user_cat_input).to_numpy()
+            elif df[column].dtype.kind in 'iuf':
+                _min, _max = ranges[column]
                 step = (_max - _min) / 100
                 user_num_input = right.slider(
                     f"Valores para {column}",
@@ -69,8 +146,8 @@ def filter_dataframe(df: pd.DataFrame) -> pd.DataFrame:
                     value=(_min, _max),
                     step=step,
                 )
-                df = df[df[column].between(*user_num_input)]
-            elif is_datetime64_any_dtype(df[column]):
+                mask &= df[column].between(*user_num_input).to_numpy()
+            elif df[column].dtype.kind == 'M':
                 user_date_input = right.date_input(
                     f"Valores para {column}",
                     value=(
@@ -81,15 +158,44 @@ def filter_dataframe(df: pd.DataFrame) -> pd.DataFrame:
                 if len(user_date_input) == 2:
                     user_date_input = tuple(map(pd.to_datetime, user_date_input))
                     start_date, end_date = user_date_input
-                    df = df.loc[df[column].between(start_date, end_date)]
+                    mask &= df[column].between(start_date, end_date).to_numpy()
             else:
                 user_text_input = right.text_input(
                     f"Substring ou Regex em {column}",
                 )
                 if user_text_input:
-                    df = df[df[column].astype(str).str.contains(user_text_input)]
+                    # Plain substrings skip the regex engine
+                    use_regex = REGEX_METACHARACTERS.search(user_text_input) is not None
+                    mask &= (
+                        df[column]
+                        .astype(str)
+                        .str.contains(user_text_input, regex=use_regex)
+                        .to_numpy(dtype=bool)
+                    )
 
-    return df
+    return df.loc[mask]
+
+@st.cache_data
+def load_data() -> tuple:
+    """
+    Loads the E-MEC report and its column statistics once and reuses them across reruns
+
+    Returns:
+        tuple: Original dataframe, unique values per column and (min, max) per numeric column
+    """
+    df = pd.read_csv(
+        'RelatorioMecTerapiaOcupacional.csv',
+        sep=';',
+        dtype=COLUMN_DTYPES,
+        low_memory=False,
+    )
+
+    # Low cardinality text columns become categorical, so filters compare integer codes
+    for col in df.columns:
+        if df[col].dtype.kind == 'O' and df[col].nunique() < 10:
+            df[col] = df[col].astype('category')
+
+    return df, column_cardinality(df), column_ranges(df)
 
-df = pd.read_csv('RelatorioMecTerapiaOcupacional.csv', sep=';')
-st.dataframe(filter_dataframe(df))
\ No newline at end of file
+df, cardinality, ranges = load_data()
+st.dataframe(filter_dataframe(df, cardinality, ranges))
\ No newline at end of file